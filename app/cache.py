@@ -44,4 +44,22 @@ def cache_get(client: Optional[redis.Redis], key: str):
         return None
 
 
-__all__ = ["get_redis_client", "cache_get", "cache_set", "PRODUTOS_CACHE_TTL"]
+def cache_delete_pattern(client: Optional[redis.Redis], pattern: str) -> int:
+    if client is None:
+        return 0
+    removed = 0
+    try:
+        batch = []
+        for key in client.scan_iter(match=pattern, count=500):
+            batch.append(key)
+            if len(batch) >= 500:
+                removed += client.delete(*batch)
+                batch = []
+        if batch:
+            removed += client.delete(*batch)
+    except redis.RedisError:
+        pass
+    return removed
+
+
+__all__ = ["get_redis_client", "cache_delete_pattern", "cache_get", "cache_set", "PRODUTOS_CACHE_TTL"]
@@ -0,0 +1,204 @@
+import csv
+import io
+import json
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+from typing import BinaryIO, Iterable, Iterator, List, Optional
+
+import redis
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from app import models
+from app.cache import cache_delete_pattern
+
+IMPORT_CHUNK_SIZE = 5000
+FORMATOS_IMPORT = ("csv", "ndjson")
+PRODUTOS_CACHE_PATTERN = "produtos:*"
+_COLUNAS = ("sku", "nome", "preco", "estoque")
+
+
+@dataclass(frozen=True)
+class ResultadoImportacao:
+    linhas: int
+    segundos: float
+
+    @property
+    def linhas_por_segundo(self) -> float:
+        return self.linhas / self.segundos if self.segundos > 0 else float(self.linhas)
+
+
+_PRECO_MAXIMO = Decimal("100000000")  # Numeric(10, 2)
+_ESTOQUE_MAXIMO = 2**31 - 1  # Integer (int4 no Postgres)
+_TAMANHOS = {"sku": 64, "nome": 255}
+
+
+def _texto(raw: dict, campo: str) -> str:
+    valor = raw[campo]
+    if valor is None or isinstance(valor, bool) or not isinstance(valor, (str, int)):
+        raise TypeError(f"{campo} inválido")
+    return str(valor).strip()
+
+
+def _inteiro(valor) -> int:
+    if valor is None or valor == "":
+        return 0
+    if isinstance(valor, bool):
+        raise TypeError("estoque inválido")
+    if isinstance(valor, float):
+        if not valor.is_integer():
+            raise ValueError("estoque deve ser inteiro")
+        return int(valor)
+    return int(valor)
+
+
+def _normalizar(raw: dict, linha: int) -> dict:
+    try:
+        sku = _texto(raw, "sku")
+        nome = _texto(raw, "nome")
+        if raw["preco"] is None or isinstance(raw["preco"], bool):
+            raise TypeError("preco inválido")
+        preco = Decimal(str(raw["preco"]))
+        if not preco.is_finite():
+            raise ValueError("preco deve ser finito")
+        preco = preco.quantize(Decimal("0.01"))
+        estoque = _inteiro(raw.get("estoque"))
+    except (KeyError, TypeError, ValueError, InvalidOperation) as exc:
+        raise ValueError(f"Linha {linha}: registro de produto inválido") from exc
+    if not sku or not nome:
+        raise ValueError(f"Linha {linha}: sku e nome são obrigatórios")
+    if len(sku) > _TAMANHOS["sku"] or len(nome) > _TAMANHOS["nome"]:
+        raise ValueError(f"Linha {linha}: sku ou nome excede o tamanho máximo")
+    if preco < 0 or estoque < 0:
+        raise ValueError(f"Linha {linha}: preço e estoque não podem ser negativos")
+    if preco >= _PRECO_MAXIMO or estoque > _ESTOQUE_MAXIMO:
+        raise ValueError(f"Linha {linha}: preço ou estoque acima do limite")
+    return {"sku": sku, "nome": nome, "preco": preco, "estoque": estoque}
+
+
+def iter_registros(arquivo: BinaryIO, formato: str) -> Iterator[dict]:
+    """Le produtos de um arquivo CSV (com cabecalho) ou NDJSON sem carrega-lo inteiro."""
+    if formato not in FORMATOS_IMPORT:
+        raise ValueError(f"Formato de importação inválido: {formato}")
+    # utf-8-sig descarta o BOM que planilhas costumam gravar no inicio do CSV
+    texto = io.TextIOWrapper(arquivo, encoding="utf-8-sig", newline="")
+    try:
+        if formato == "csv":
+            for linha, raw in enumerate(csv.DictReader(texto), start=2):
+                yield _normalizar(raw, linha)
+        else:
+            for linha, conteudo in enumerate(texto, start=1):
+                if not conteudo.strip():
+                    continue
+                try:
+                    raw = json.loads(conteudo)
+                except json.JSONDecodeError as exc:
+                    raise ValueError(f"Linha {linha}: JSON inválido") from exc
+                if not isinstance(raw, dict):
+                    raise ValueError(f"Linha {linha}: registro de produto inválido")
+                yield _normalizar(raw, linha)
+    finally:
+        texto.detach()
+
+
+def _em_lotes(registros: Iterable[dict], tamanho: int) -> Iterator[List[dict]]:
+    it = iter(registros)
+    while True:
+        lote = list(islice(it, tamanho))
+        if not lote:
+            return
+        yield lote
+
+
+def _upsert_executemany(db: Session, lotes: Iterable[List[dict]]) -> int:
+    dialect = db.get_bind().dialect.name
+    if dialect not in ("postgresql", "sqlite"):
+        raise ValueError(f"Importação em massa não suportada para {dialect}")
+    upsert = pg_insert if dialect == "postgresql" else sqlite_insert
+    stmt = upsert(models.Produto)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["sku"],
+        set_={col: stmt.excluded[col] for col in ("nome", "preco", "estoque")},
+    )
+    total = 0
+    for lote in lotes:
+        agora = datetime.utcnow()
+        # ON CONFLICT nao aceita a mesma chave duas vezes no mesmo comando (Postgres)
+        por_sku = {registro["sku"]: {**registro, "created_at": agora} for registro in lote}
+        db.execute(stmt, list(por_sku.values()))
+        total += len(lote)
+    return total
+
+
+def _upsert_copy(db: Session, lotes: Iterable[List[dict]]) -> int:
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.execute(
+            "CREATE TEMP TABLE produtos_staging "
+            "(ordem bigint, sku varchar(64), nome varchar(255), preco numeric(10, 2), estoque integer) "
+            "ON COMMIT DROP"
+        )
+        total = 0
+        for lote in lotes:
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            for registro in lote:
+                total += 1
+                writer.writerow([total] + [registro[col] for col in _COLUNAS])
+            buffer.seek(0)
+            cursor.copy_expert(
+                "COPY produtos_staging (ordem, sku, nome, preco, estoque) FROM STDIN WITH (FORMAT csv)",
+                buffer,
+            )
+        cursor.execute(
+            "INSERT INTO produtos (sku, nome, preco, estoque, created_at) "
+            "SELECT DISTINCT ON (sku) sku, nome, preco, estoque, now() AT TIME ZONE 'utc' "
+            "FROM produtos_staging ORDER BY sku, ordem DESC "
+            "ON CONFLICT (sku) DO UPDATE SET "
+            "nome = EXCLUDED.nome, preco = EXCLUDED.preco, estoque = EXCLUDED.estoque"
+        )
+    finally:
+        cursor.close()
+    return total
+
+
+def importar_produtos(
+    db: Session,
+    registros: Iterable[dict],
+    cache: Optional[redis.Redis] = None,
+    chunk_size: int = IMPORT_CHUNK_SIZE,
+) -> ResultadoImportacao:
+    """Faz upsert de produtos por ``sku`` em lotes e invalida o cache uma unica vez.
+
+    No Postgres (psycopg2) os lotes sao enviados via ``COPY`` para uma tabela
+    temporaria e aplicados com um unico ``INSERT ... ON CONFLICT``; nos demais
+    bancos cada lote vira um ``executemany`` de upsert. Tudo roda em uma
+    transacao: um registro invalido desfaz a importacao inteira.
+    """
+    inicio = time.perf_counter()
+    lotes = _em_lotes(registros, chunk_size)
+    try:
+        dialect = db.get_bind().dialect
+        if dialect.name == "postgresql" and dialect.driver == "psycopg2":
+            linhas = _upsert_copy(db, lotes)
+        else:
+            linhas = _upsert_executemany(db, lotes)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    cache_delete_pattern(cache, PRODUTOS_CACHE_PATTERN)
+    return ResultadoImportacao(linhas=linhas, segundos=time.perf_counter() - inicio)
+
+
+__all__ = [
+    "FORMATOS_IMPORT",
+    "IMPORT_CHUNK_SIZE",
+    "ResultadoImportacao",
+    "importar_produtos",
+    "iter_registros",
+]
@@ -0,0 +1,150 @@
+import csv
+import io
+import json
+from datetime import datetime
+from itertools import groupby
+from typing import Iterable, Iterator, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app import models
+
+EXPORT_BATCH_SIZE = 1000
+EXPORT_CHUNK_BYTES = 64 * 1024
+FORMATOS_EXPORT = ("ndjson", "csv")
+STATUS_PEDIDO = tuple(models.Pedido.status.type.enums)
+CSV_COLUNAS = (
+    "pedido_id",
+    "status",
+    "total",
+    "created_at",
+    "produto_id",
+    "quantidade",
+    "preco_unitario",
+)
+
+
+def iter_linhas_export(
+    db: Session,
+    status: Optional[str] = None,
+    desde: Optional[datetime] = None,
+    ate: Optional[datetime] = None,
+    after_id: Optional[int] = None,
+    batch_size: int = EXPORT_BATCH_SIZE,
+) -> Iterator[dict]:
+    """Percorre ``pedidos`` x ``itens_pedido`` com cursor no servidor.
+
+    Gera uma linha por item (ou uma linha sem item para pedidos vazios),
+    ordenada por ``pedido_id``; ``after_id`` retoma apos o ultimo pedido
+    exportado e ``desde``/``ate`` filtram ``created_at`` em ``[desde, ate)``.
+    """
+    stmt = (
+        select(
+            models.Pedido.id,
+            models.Pedido.status,
+            models.Pedido.total,
+            models.Pedido.created_at,
+            models.ItemPedido.produto_id,
+            models.ItemPedido.quantidade,
+            models.ItemPedido.preco_unitario,
+        )
+        .outerjoin(models.ItemPedido, models.ItemPedido.pedido_id == models.Pedido.id)
+        .order_by(models.Pedido.id, models.ItemPedido.id)
+        .execution_options(yield_per=batch_size)
+    )
+    if status is not None:
+        stmt = stmt.where(models.Pedido.status == status)
+    if desde is not None:
+        stmt = stmt.where(models.Pedido.created_at >= desde)
+    if ate is not None:
+        stmt = stmt.where(models.Pedido.created_at < ate)
+    if after_id is not None:
+        stmt = stmt.where(models.Pedido.id > after_id)
+
+    for row in db.execute(stmt):
+        yield {
+            "pedido_id": row[0],
+            "status": row[1],
+            "total": float(row[2]),
+            "created_at": row[3].isoformat(),
+            "produto_id": row[4],
+            "quantidade": row[5],
+            "preco_unitario": float(row[6]) if row[6] is not None else None,
+        }
+
+
+def to_ndjson(linhas: Iterable[dict]) -> Iterator[str]:
+    """Agrupa as linhas por pedido e emite um objeto JSON por linha."""
+    for pedido_id, grupo in groupby(linhas, key=lambda linha: linha["pedido_id"]):
+        grupo = list(grupo)
+        primeira = grupo[0]
+        pedido = {
+            "id": pedido_id,
+            "status": primeira["status"],
+            "total": primeira["total"],
+            "created_at": primeira["created_at"],
+            "itens": [
+                {
+                    "produto_id": linha["produto_id"],
+                    "quantidade": linha["quantidade"],
+                    "preco_unitario": linha["preco_unitario"],
+                }
+                for linha in grupo
+                if linha["produto_id"] is not None
+            ],
+        }
+        yield json.dumps(pedido) + "\n"
+
+
+def to_csv(linhas: Iterable[dict]) -> Iterator[str]:
+    """Emite o cabecalho e uma linha CSV por item."""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=CSV_COLUNAS)
+    writer.writeheader()
+    for linha in linhas:
+        writer.writerow(linha)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def em_blocos(partes: Iterable[str], tamanho: int = EXPORT_CHUNK_BYTES) -> Iterator[str]:
+    """Junta partes pequenas em blocos de ~``tamanho`` para reduzir writes na resposta."""
+    bloco = []
+    acumulado = 0
+    for parte in partes:
+        bloco.append(parte)
+        acumulado += len(parte)
+        if acumulado >= tamanho:
+            yield "".join(bloco)
+            bloco = []
+            acumulado = 0
+    if bloco:
+        yield "".join(bloco)
+
+
+def exportar_pedidos(db: Session, formato: str = "ndjson", **filtros) -> Iterator[str]:
+    if formato not in FORMATOS_EXPORT:
+        raise ValueError(f"Formato de exportação inválido: {formato}")
+    status = filtros.get("status")
+    if status is not None and status not in STATUS_PEDIDO:
+        raise ValueError(f"Status deve ser um de {', '.join(STATUS_PEDIDO)}")
+    linhas = iter_linhas_export(db, **filtros)
+    return to_ndjson(linhas) if formato == "ndjson" else to_csv(linhas)
+
+
+__all__ = [
+    "CSV_COLUNAS",
+    "EXPORT_BATCH_SIZE",
+    "EXPORT_CHUNK_BYTES",
+    "FORMATOS_EXPORT",
+    "STATUS_PEDIDO",
+    "em_blocos",
+    "exportar_pedidos",
+    "iter_linhas_export",
+    "to_csv",
+    "to_ndjson",
+]
@@ -1,6 +1,6 @@
 from datetime import datetime
 from decimal import Decimal
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Enum, Numeric
+from sqlalchemy import Column, Date, Integer, String, DateTime, ForeignKey, Enum, Numeric, inspect, text
 from sqlalchemy.orm import relationship
 
 from .database import Base
@@ -10,6 +10,8 @@ class Produto(Base):
     __tablename__ = "produtos"
 
     id = Column(Integer, primary_key=True, index=True)
+    # Indice unico separado (ix_produtos_sku) para poder ser criado em bancos antigos, ver criar_schema
+    sku = Column(String(64), nullable=True, index=True, unique=True)
     nome = Column(String(255), nullable=False, index=True)
     preco = Column(Numeric(10, 2), nullable=False)
     estoque = Column(Integer, nullable=False, default=0)
@@ -51,3 +53,39 @@ class ItemPedido(Base):
 
     pedido = relationship("Pedido", back_populates="itens")
     produto = relationship("Produto", back_populates="itens")
+
+
+class VendaProduto(Base):
+    """Unidades e receita acumuladas por produto (pedidos CRIADO/PAGO)."""
+
+    __tablename__ = "vendas_produto"
+
+    produto_id = Column(Integer, ForeignKey("produtos.id"), primary_key=True)
+    unidades = Column(Integer, nullable=False, default=0, index=True)
+    receita = Column(Numeric(14, 2), nullable=False, default=Decimal("0.00"))
+
+
+class VendaDiaria(Base):
+    """Quantidade de pedidos e receita por dia e status."""
+
+    __tablename__ = "vendas_diarias"
+
+    dia = Column(Date, primary_key=True)
+    status = Column(String(20), primary_key=True)
+    pedidos = Column(Integer, nullable=False, default=0)
+    receita = Column(Numeric(14, 2), nullable=False, default=Decimal("0.00"))
+
+
+def criar_schema(bind) -> None:
+    """Cria as tabelas e aplica upgrades em tabelas de versoes anteriores.
+
+    ``create_all`` nao altera tabelas existentes; sem ferramenta de migracao,
+    as colunas novas sao adicionadas aqui de forma idempotente.
+    """
+    Base.metadata.create_all(bind=bind)
+    colunas = {coluna["name"] for coluna in inspect(bind).get_columns("produtos")}
+    with bind.begin() as conn:
+        if "sku" not in colunas:
+            # SQLite nao aceita ADD COLUMN ... UNIQUE; a unicidade vem do indice
+            conn.execute(text("ALTER TABLE produtos ADD COLUMN sku VARCHAR(64)"))
+        conn.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS ix_produtos_sku ON produtos (sku)"))
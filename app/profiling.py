@@ -0,0 +1,206 @@
+import cProfile
+import itertools
+import logging
+import os
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Iterator, Optional
+
+import redis
+
+from app.cache import REDIS_URL
+
+logger = logging.getLogger(__name__)
+
+
+def _env_float(nome: str, padrao: float, minimo: float, maximo: float) -> float:
+    bruto = os.getenv(nome)
+    if bruto is None:
+        return padrao
+    try:
+        valor = float(bruto)
+    except ValueError:
+        valor = None
+    if valor is None or not minimo <= valor <= maximo:
+        logger.warning("%s=%r inválido; usando %s", nome, bruto, padrao)
+        return padrao
+    return valor
+
+
+PROFILE_DIR = os.getenv("PROFILE_DIR", "./profiles")
+PROFILE_SAMPLE_RATE = _env_float("PROFILE_SAMPLE_RATE", 0.0, 0.0, 1.0)
+PROFILE_SYNC_INTERVAL = _env_float("PROFILE_SYNC_INTERVAL", 5.0, 0.0, 3600.0)
+PROFILE_MAX_FILES = int(_env_float("PROFILE_MAX_FILES", 200, 0, 1_000_000))
+PROFILE_RATE_TTL = int(_env_float("PROFILE_RATE_TTL", 3600, 1, 7 * 24 * 3600))
+PROFILE_ADMIN_TOKEN = os.getenv("PROFILE_ADMIN_TOKEN")
+PROFILE_HEADER = "X-Debug-Profile"
+PROFILE_RATE_KEY = "profiling:sample_rate"
+
+# A partir do Python 3.12 o cProfile registra uma unica ferramenta por
+# interpretador: so um perfil pode estar ativo por processo.
+_perfil_ativo = threading.Lock()
+_sequencia = itertools.count()
+
+
+def debug_solicitado(valor: Any) -> bool:
+    """Interpreta o header/flag de debug; apenas ``1``/``true`` forcam o perfil."""
+    if valor is None:
+        return False
+    return str(valor).strip().lower() in ("1", "true")
+
+
+def publicar_sample_rate(client: Optional[redis.Redis], sample_rate: float) -> None:
+    """Grava a taxa no Redis para que os demais processos (API e worker) a adotem.
+
+    A chave expira em ``PROFILE_RATE_TTL`` segundos; depois disso cada processo
+    volta a sua taxa inicial (``PROFILE_SAMPLE_RATE``).
+    """
+    if client is None:
+        return
+    try:
+        client.setex(PROFILE_RATE_KEY, PROFILE_RATE_TTL, str(sample_rate))
+    except redis.RedisError:
+        logger.warning("Falha ao publicar taxa de profiling no Redis")
+
+
+@dataclass
+class ProfileRun:
+    """Identifica uma execucao perfilada; ``pedido_id`` pode ser preenchido depois."""
+
+    nome: str
+    pedido_id: Optional[int] = None
+
+
+class Profiler:
+    """Amostrador opt-in de cProfile; desligado custa apenas uma comparacao."""
+
+    def __init__(
+        self,
+        output_dir: Optional[str] = None,
+        sample_rate: float = PROFILE_SAMPLE_RATE,
+        max_files: int = PROFILE_MAX_FILES,
+    ):
+        self.output_dir = output_dir or PROFILE_DIR
+        self.sample_rate = 0.0
+        self.max_files = max_files
+        self.set_sample_rate(sample_rate)
+        self.taxa_inicial = self.sample_rate
+        self._parar = threading.Event()
+
+    def set_sample_rate(self, sample_rate: float) -> None:
+        if not 0.0 <= sample_rate <= 1.0:
+            raise ValueError("Taxa de amostragem deve estar entre 0 e 1")
+        self.sample_rate = sample_rate
+
+    def sincronizar(self, client: Optional[redis.Redis]) -> None:
+        """Adota a taxa publicada no Redis (ou a inicial, se a chave expirou)."""
+        if client is None:
+            return
+        try:
+            valor = client.get(PROFILE_RATE_KEY)
+        except redis.RedisError:
+            return
+        if valor is None:
+            self.sample_rate = self.taxa_inicial
+            return
+        try:
+            self.set_sample_rate(float(valor))
+        except ValueError:
+            logger.warning("Taxa de profiling inválida no Redis: %r", valor)
+
+    def iniciar_sincronizacao(self, client: redis.Redis, intervalo: float = PROFILE_SYNC_INTERVAL) -> None:
+        """Relê a taxa do Redis em uma thread daemon, fora do caminho das requisicoes."""
+        if intervalo <= 0:
+            return
+
+        def _loop() -> None:
+            while not self._parar.is_set():
+                self.sincronizar(client)
+                self._parar.wait(intervalo)
+
+        threading.Thread(target=_loop, name="profiling-sync", daemon=True).start()
+
+    def parar_sincronizacao(self) -> None:
+        self._parar.set()
+
+    def should_profile(self, forced: bool = False) -> bool:
+        if forced:
+            return True
+        return self.sample_rate > 0.0 and random.random() < self.sample_rate
+
+    @contextmanager
+    def profile(self, nome: str, forced: bool = False) -> Iterator[ProfileRun]:
+        run = ProfileRun(nome=nome)
+        # Outro perfil em andamento: esta execucao segue sem profiling.
+        if not self.should_profile(forced) or not _perfil_ativo.acquire(blocking=False):
+            yield run
+            return
+
+        try:
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:
+                logger.warning("Profiler indisponível; %s seguirá sem perfil", nome)
+                yield run
+                return
+            try:
+                yield run
+            finally:
+                profiler.disable()
+                self._dump(profiler, run)
+        finally:
+            _perfil_ativo.release()
+
+    def _dump(self, profiler: cProfile.Profile, run: ProfileRun) -> None:
+        nome = re.sub(r"[^A-Za-z0-9_.-]+", "_", run.nome)
+        pedido = run.pedido_id if run.pedido_id is not None else "na"
+        path = os.path.join(self.output_dir, f"{nome}-{pedido}-{int(time.time() * 1000)}-{os.getpid()}-{next(_sequencia)}.pstats")
+        try:
+            os.makedirs(self.output_dir, exist_ok=True)
+            existentes = sum(1 for entry in os.scandir(self.output_dir) if entry.name.endswith(".pstats"))
+            if existentes >= self.max_files:
+                logger.warning(
+                    "Limite de %s perfis em %s atingido; perfil de %s descartado",
+                    self.max_files,
+                    self.output_dir,
+                    run.nome,
+                )
+                return
+            profiler.dump_stats(path)
+            logger.info("Perfil de %s gravado em %s", run.nome, path)
+        except OSError:
+            logger.exception("Falha ao gravar perfil de %s", run.nome)
+
+
+_profiler: Optional[Profiler] = None
+
+
+def get_profiler() -> Profiler:
+    global _profiler
+    if _profiler is None:
+        _profiler = Profiler()
+        # Cliente dedicado com timeouts curtos: um Redis fora do ar nao trava a thread.
+        try:
+            client = redis.Redis.from_url(REDIS_URL, socket_connect_timeout=1, socket_timeout=1)
+        except (redis.RedisError, ValueError):
+            logger.warning("Redis indisponível; taxa de profiling não será sincronizada")
+        else:
+            _profiler.iniciar_sincronizacao(client)
+    return _profiler
+
+
+__all__ = [
+    "PROFILE_ADMIN_TOKEN",
+    "PROFILE_HEADER",
+    "PROFILE_RATE_KEY",
+    "ProfileRun",
+    "Profiler",
+    "debug_solicitado",
+    "get_profiler",
+    "publicar_sample_rate",
+]
@@ -1,10 +1,12 @@
-from typing import List
+from datetime import date
+from typing import List, Optional
 from decimal import Decimal
-from pydantic import BaseModel, Field, conint, validator
+from pydantic import BaseModel, Field, confloat, conint, validator
 
 
 class ProdutoOut(BaseModel):
     id: int
+    sku: Optional[str] = None
     nome: str
     preco: float
     estoque: int
@@ -46,3 +48,36 @@ class PedidoOut(BaseModel):
     class Config:
         orm_mode = True
 
+
+class VendaProdutoOut(BaseModel):
+    produto_id: int
+    unidades: int
+    receita: float
+
+    class Config:
+        orm_mode = True
+
+
+class VendaDiariaOut(BaseModel):
+    dia: date
+    status: str
+    pedidos: int
+    receita: float
+
+    class Config:
+        orm_mode = True
+
+
+class ProfilingConfigIn(BaseModel):
+    sample_rate: confloat(ge=0, le=1)  # type: ignore
+
+
+class ProfilingConfigOut(BaseModel):
+    sample_rate: float
+    output_dir: str
+
+
+class ImportacaoOut(BaseModel):
+    linhas: int
+    segundos: float
+    linhas_por_segundo: float
@@ -0,0 +1,178 @@
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import delete, insert, select, text, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from app import models
+
+# Status cujos itens contam como venda nos agregados por produto.
+STATUS_VENDA = ("CRIADO", "PAGO")
+# Status acompanhados nos agregados diarios (PENDENTE/PROCESSANDO sao transitorios).
+STATUS_AGREGADOS = ("CRIADO", "PAGO", "CANCELADO")
+
+REBUILD_BATCH_SIZE = 1000
+
+
+def _incrementar(db: Session, model, chaves: dict, deltas: dict) -> None:
+    """Soma ``deltas`` na linha identificada por ``chaves`` (upsert atomico)."""
+    dialect = db.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        upsert = pg_insert if dialect == "postgresql" else sqlite_insert
+        stmt = upsert(model).values(**chaves, **deltas)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(chaves),
+            set_={col: getattr(model, col) + stmt.excluded[col] for col in deltas},
+        )
+        db.execute(stmt)
+        return
+
+    filtro = [getattr(model, col) == valor for col, valor in chaves.items()]
+    result = db.execute(
+        update(model)
+        .where(*filtro)
+        .values({col: getattr(model, col) + valor for col, valor in deltas.items()})
+    )
+    if result.rowcount == 0:
+        db.add(model(**chaves, **deltas))
+
+
+def _dia(pedido: models.Pedido) -> date:
+    return pedido.created_at.date()
+
+
+def registrar_transicao(
+    db: Session,
+    pedido: models.Pedido,
+    status_anterior: Optional[str],
+    status_novo: str,
+) -> None:
+    """Ajusta os agregados de vendas para a mudanca de status de ``pedido``.
+
+    Deve ser chamada antes do commit da transicao (para que agregados e pedido
+    sejam persistidos juntos) e enquanto ``pedido.itens`` ainda reflete os
+    itens vendidos.
+    """
+    if status_anterior == status_novo:
+        return
+
+    total = Decimal(pedido.total or 0)
+    if status_anterior in STATUS_AGREGADOS:
+        _incrementar(
+            db,
+            models.VendaDiaria,
+            {"dia": _dia(pedido), "status": status_anterior},
+            {"pedidos": -1, "receita": -total},
+        )
+    if status_novo in STATUS_AGREGADOS:
+        _incrementar(
+            db,
+            models.VendaDiaria,
+            {"dia": _dia(pedido), "status": status_novo},
+            {"pedidos": 1, "receita": total},
+        )
+
+    vendia = status_anterior in STATUS_VENDA
+    vende = status_novo in STATUS_VENDA
+    if vendia == vende:
+        return
+    sinal = 1 if vende else -1
+    # Soma por produto e atualiza em ordem de produto_id: workers concorrentes
+    # travam as linhas de vendas_produto na mesma ordem e nao entram em deadlock.
+    por_produto: Dict[int, list] = defaultdict(lambda: [0, Decimal("0.00")])
+    for item in pedido.itens:
+        acc = por_produto[item.produto_id]
+        acc[0] += item.quantidade
+        acc[1] += Decimal(item.preco_unitario) * item.quantidade
+    for produto_id in sorted(por_produto):
+        unidades, receita = por_produto[produto_id]
+        _incrementar(
+            db,
+            models.VendaProduto,
+            {"produto_id": produto_id},
+            {"unidades": sinal * unidades, "receita": sinal * receita},
+        )
+
+
+def rebuild_agregados(db: Session, batch_size: int = REBUILD_BATCH_SIZE) -> Tuple[int, int]:
+    """Recalcula os agregados a partir do historico de pedidos.
+
+    Pedidos e itens sao lidos em lotes de ``batch_size`` via cursor no
+    servidor; apenas os totais por produto e por dia/status ficam em memoria.
+    Retorna ``(pedidos, itens)`` processados.
+
+    No Postgres as tabelas de agregados ficam bloqueadas (``EXCLUSIVE``) do
+    inicio da leitura ate o commit, entao incrementos concorrentes do worker
+    esperam e sao aplicados sobre os valores recalculados. Nos demais bancos
+    os workers devem estar parados durante o rebuild.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(text("LOCK TABLE vendas_produto, vendas_diarias IN EXCLUSIVE MODE"))
+
+    por_dia: Dict[Tuple[date, str], list] = defaultdict(lambda: [0, Decimal("0.00")])
+    por_produto: Dict[int, list] = defaultdict(lambda: [0, Decimal("0.00")])
+
+    pedidos_stmt = (
+        select(models.Pedido.created_at, models.Pedido.status, models.Pedido.total)
+        .where(models.Pedido.status.in_(STATUS_AGREGADOS))
+        .order_by(models.Pedido.id)
+        .execution_options(yield_per=batch_size)
+    )
+    n_pedidos = 0
+    for created_at, status, total in db.execute(pedidos_stmt):
+        acc = por_dia[(created_at.date(), status)]
+        acc[0] += 1
+        acc[1] += Decimal(total)
+        n_pedidos += 1
+
+    itens_stmt = (
+        select(
+            models.ItemPedido.produto_id,
+            models.ItemPedido.quantidade,
+            models.ItemPedido.preco_unitario,
+        )
+        .join(models.Pedido, models.Pedido.id == models.ItemPedido.pedido_id)
+        .where(models.Pedido.status.in_(STATUS_VENDA))
+        .order_by(models.ItemPedido.id)
+        .execution_options(yield_per=batch_size)
+    )
+    n_itens = 0
+    for produto_id, quantidade, preco_unitario in db.execute(itens_stmt):
+        acc = por_produto[produto_id]
+        acc[0] += quantidade
+        acc[1] += Decimal(preco_unitario) * quantidade
+        n_itens += 1
+
+    db.execute(delete(models.VendaDiaria))
+    db.execute(delete(models.VendaProduto))
+    if por_dia:
+        db.execute(
+            insert(models.VendaDiaria),
+            [
+                {"dia": dia, "status": status, "pedidos": pedidos, "receita": receita}
+                for (dia, status), (pedidos, receita) in por_dia.items()
+            ],
+        )
+    if por_produto:
+        db.execute(
+            insert(models.VendaProduto),
+            [
+                {"produto_id": produto_id, "unidades": unidades, "receita": receita}
+                for produto_id, (unidades, receita) in por_produto.items()
+            ],
+        )
+    db.commit()
+    return n_pedidos, n_itens
+
+
+__all__ = [
+    "REBUILD_BATCH_SIZE",
+    "STATUS_AGREGADOS",
+    "STATUS_VENDA",
+    "rebuild_agregados",
+    "registrar_transicao",
+]
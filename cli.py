@@ -0,0 +1,119 @@
+import argparse
+import logging
+import os
+import sys
+from datetime import datetime
+from typing import Optional, Sequence
+
+from app.cache import get_redis_client
+from app.catalogo import FORMATOS_IMPORT, IMPORT_CHUNK_SIZE, importar_produtos, iter_registros
+from app import models
+from app.database import SessionLocal, engine
+from app.exportacao import EXPORT_BATCH_SIZE, FORMATOS_EXPORT, STATUS_PEDIDO, em_blocos, exportar_pedidos
+from app.vendas import REBUILD_BATCH_SIZE, rebuild_agregados
+
+logger = logging.getLogger(__name__)
+
+
+def _rebuild_vendas(args: argparse.Namespace) -> int:
+    models.criar_schema(engine)
+    db = SessionLocal()
+    try:
+        pedidos, itens = rebuild_agregados(db, batch_size=args.batch_size)
+    finally:
+        db.close()
+    logger.info("Agregados de vendas recalculados: %s pedidos, %s itens", pedidos, itens)
+    return 0
+
+
+def _export_pedidos(args: argparse.Namespace) -> int:
+    saida = open(args.output, "w", encoding="utf-8", newline="") if args.output else sys.stdout
+    db = SessionLocal()
+    try:
+        partes = exportar_pedidos(
+            db,
+            formato=args.formato,
+            status=args.status,
+            desde=args.desde,
+            ate=args.ate,
+            after_id=args.after_id,
+            batch_size=args.batch_size,
+        )
+        for bloco in em_blocos(partes):
+            saida.write(bloco)
+    finally:
+        db.close()
+        if saida is not sys.stdout:
+            saida.close()
+    return 0
+
+
+def _import_produtos(args: argparse.Namespace) -> int:
+    formato = args.formato or os.path.splitext(args.arquivo)[1].lstrip(".").lower()
+    if formato not in FORMATOS_IMPORT:
+        logger.error("Formato de importação inválido: %s", formato)
+        return 2
+
+    models.criar_schema(engine)
+    db = SessionLocal()
+    try:
+        with open(args.arquivo, "rb") as arquivo:
+            resultado = importar_produtos(
+                db,
+                iter_registros(arquivo, formato),
+                cache=get_redis_client(),
+                chunk_size=args.chunk_size,
+            )
+    except ValueError as exc:
+        logger.error("Importação abortada: %s", exc)
+        return 1
+    finally:
+        db.close()
+    logger.info(
+        "Catálogo importado: %s linhas em %.2fs (%.0f linhas/s)",
+        resultado.linhas,
+        resultado.segundos,
+        resultado.linhas_por_segundo,
+    )
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="cli.py", description="Comandos administrativos do BuildFlow")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    rebuild = sub.add_parser(
+        "rebuild-vendas",
+        help="recalcula os agregados de vendas a partir do historico "
+        "(fora do Postgres, pare os workers antes)",
+    )
+    rebuild.add_argument("--batch-size", type=int, default=REBUILD_BATCH_SIZE)
+    rebuild.set_defaults(func=_rebuild_vendas)
+
+    export = sub.add_parser("export-pedidos", help="exporta pedidos e itens em NDJSON ou CSV")
+    export.add_argument("--formato", choices=FORMATOS_EXPORT, default="ndjson")
+    export.add_argument("--status", choices=STATUS_PEDIDO)
+    export.add_argument("--desde", type=datetime.fromisoformat, help="created_at >= (ISO 8601)")
+    export.add_argument("--ate", type=datetime.fromisoformat, help="created_at < (ISO 8601)")
+    export.add_argument("--after-id", type=int, help="retoma apos este pedido_id")
+    export.add_argument("--batch-size", type=int, default=EXPORT_BATCH_SIZE)
+    export.add_argument("--output", "-o", help="arquivo de saida (padrao: stdout)")
+    export.set_defaults(func=_export_pedidos)
+
+    importacao = sub.add_parser("import-produtos", help="importa/atualiza produtos por sku a partir de CSV ou NDJSON")
+    importacao.add_argument("arquivo")
+    importacao.add_argument("--formato", choices=FORMATOS_IMPORT, help="padrao: extensao do arquivo")
+    importacao.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE)
+    importacao.set_defaults(func=_import_produtos)
+
+    return parser
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+    sys.exit(main())
@@ -1,18 +1,44 @@
+import hmac
 import logging
+import tempfile
 import time
+from datetime import date, datetime
 from decimal import Decimal
 from typing import List, Optional
 
-from fastapi import Depends, FastAPI, HTTPException
+from fastapi import Depends, FastAPI, Header, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.exc import OperationalError
 from sqlalchemy.orm import Session
 from redis import Redis
 
 from app import models
-from app.database import Base, engine, get_db
+from app.database import engine, get_db
 from app.cache import cache_get, cache_set, get_redis_client
+from app.catalogo import FORMATOS_IMPORT, importar_produtos, iter_registros
+from app.exportacao import FORMATOS_EXPORT, em_blocos, exportar_pedidos
 from app.messaging import PedidoQueuePublisher, get_queue_publisher
-from app.schemas import ItemPedidoOut, PedidoCreateIn, PedidoOut, ProdutoOut
+from app.profiling import (
+    PROFILE_ADMIN_TOKEN,
+    PROFILE_HEADER,
+    ProfileRun,
+    Profiler,
+    debug_solicitado,
+    get_profiler,
+    publicar_sample_rate,
+)
+from app.schemas import (
+    ImportacaoOut,
+    ItemPedidoOut,
+    PedidoCreateIn,
+    PedidoOut,
+    ProdutoOut,
+    ProfilingConfigIn,
+    ProfilingConfigOut,
+    VendaDiariaOut,
+    VendaProdutoOut,
+)
 from app.services import build_item_specs
 
 
@@ -28,14 +54,14 @@ def on_startup():
     delay = 2
     for attempt in range(retries):
         try:
-            Base.metadata.create_all(bind=engine)
+            models.criar_schema(engine)
             db = next(get_db())
             try:
                 if db.query(models.Produto).count() == 0:
                     seed = [
-                        models.Produto(nome="Furadeira 500W", preco=Decimal("249.90"), estoque=25),
-                        models.Produto(nome="Parafusadeira 12V", preco=Decimal("199.90"), estoque=40),
-                        models.Produto(nome="Serra Circular 1500W", preco=Decimal("549.90"), estoque=10),
+                        models.Produto(sku="FUR-500W", nome="Furadeira 500W", preco=Decimal("249.90"), estoque=25),
+                        models.Produto(sku="PAR-12V", nome="Parafusadeira 12V", preco=Decimal("199.90"), estoque=40),
+                        models.Produto(sku="SER-1500W", nome="Serra Circular 1500W", preco=Decimal("549.90"), estoque=10),
                     ]
                     db.add_all(seed)
                     db.commit()
@@ -64,6 +90,7 @@ def listar_produtos(
     data = [
         ProdutoOut(
             id=p.id,
+            sku=p.sku,
             nome=p.nome,
             preco=float(p.preco),
             estoque=p.estoque,
@@ -74,12 +101,60 @@ def listar_produtos(
     return data
 
 
+@app.post("/produtos/import", response_model=ImportacaoOut)
+async def importar_catalogo(
+    request: Request,
+    formato: str = "csv",
+    db: Session = Depends(get_db),
+    cache: Optional[Redis] = Depends(get_redis_client),
+):
+    if formato not in FORMATOS_IMPORT:
+        raise HTTPException(status_code=400, detail=f"Formato deve ser um de {', '.join(FORMATOS_IMPORT)}")
+
+    # Spool do upload (memoria ate 8 MiB, depois disco) para nao manter o arquivo inteiro em RAM
+    with tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024) as arquivo:
+        # Escritas no threadpool: passado o limite o spool vai para disco e bloquearia o loop
+        async for parte in request.stream():
+            await run_in_threadpool(arquivo.write, parte)
+        await run_in_threadpool(arquivo.seek, 0)
+        try:
+            resultado = await run_in_threadpool(
+                importar_produtos, db, iter_registros(arquivo, formato), cache
+            )
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+    logger.info(
+        "Catálogo importado: %s linhas em %.2fs (%.0f linhas/s)",
+        resultado.linhas,
+        resultado.segundos,
+        resultado.linhas_por_segundo,
+    )
+    return ImportacaoOut(
+        linhas=resultado.linhas,
+        segundos=resultado.segundos,
+        linhas_por_segundo=resultado.linhas_por_segundo,
+    )
+
+
 @app.post("/pedidos", response_model=PedidoOut, status_code=201)
 def criar_pedido(
     payload: PedidoCreateIn,
     db: Session = Depends(get_db),
     publisher: PedidoQueuePublisher = Depends(get_queue_publisher),
+    profiler: Profiler = Depends(get_profiler),
+    debug_profile: Optional[str] = Header(None, alias=PROFILE_HEADER),
 ):
+    with profiler.profile("criar_pedido", forced=debug_solicitado(debug_profile)) as perfil:
+        return _criar_pedido(payload, db, publisher, perfil)
+
+
+def _criar_pedido(
+    payload: PedidoCreateIn,
+    db: Session,
+    publisher: PedidoQueuePublisher,
+    perfil: ProfileRun,
+) -> PedidoOut:
     if not payload.itens:
         raise HTTPException(status_code=400, detail="Pedido deve conter ao menos um item")
 
@@ -96,6 +171,7 @@ def criar_pedido(
 
     try:
         db.flush()
+        perfil.pedido_id = pedido.id
         publisher.publish_pedido(pedido.id, itens_payload)
         db.commit()
     except Exception as exc:  # pragma: no cover - defensive logging em produção
@@ -121,6 +197,38 @@ def criar_pedido(
     )
 
 
+@app.get("/pedidos/export")
+def exportar(
+    formato: str = "ndjson",
+    status: Optional[str] = None,
+    desde: Optional[datetime] = None,
+    ate: Optional[datetime] = None,
+    after_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+):
+    if formato not in FORMATOS_EXPORT:
+        raise HTTPException(status_code=400, detail=f"Formato deve ser um de {', '.join(FORMATOS_EXPORT)}")
+
+    # Valida os filtros antes do streaming: depois do primeiro byte nao da para responder 400
+    try:
+        partes = exportar_pedidos(
+            db,
+            formato=formato,
+            status=status,
+            desde=desde,
+            ate=ate,
+            after_id=after_id,
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    media_type = "application/x-ndjson" if formato == "ndjson" else "text/csv"
+    return StreamingResponse(
+        em_blocos(partes),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="pedidos.{formato}"'},
+    )
+
+
 @app.get("/pedidos/{pedido_id}", response_model=PedidoOut)
 def obter_pedido(pedido_id: int, db: Session = Depends(get_db)):
     pedido = (
@@ -147,6 +255,65 @@ def obter_pedido(pedido_id: int, db: Session = Depends(get_db)):
     )
 
 
+@app.get("/vendas/produtos/top", response_model=List[VendaProdutoOut])
+def top_produtos(limit: int = Query(10, ge=1, le=100), db: Session = Depends(get_db)):
+    vendas = (
+        db.query(models.VendaProduto)
+        .order_by(models.VendaProduto.unidades.desc())
+        .limit(limit)
+        .all()
+    )
+    return [
+        VendaProdutoOut(produto_id=v.produto_id, unidades=v.unidades, receita=float(v.receita))
+        for v in vendas
+    ]
+
+
+@app.get("/vendas/produtos/{produto_id}", response_model=VendaProdutoOut)
+def vendas_produto(produto_id: int, db: Session = Depends(get_db)):
+    venda = db.get(models.VendaProduto, produto_id)
+    if not venda:
+        return VendaProdutoOut(produto_id=produto_id, unidades=0, receita=0.0)
+    return VendaProdutoOut(
+        produto_id=venda.produto_id,
+        unidades=venda.unidades,
+        receita=float(venda.receita),
+    )
+
+
+@app.get("/vendas/dias/{dia}", response_model=List[VendaDiariaOut])
+def vendas_dia(dia: date, db: Session = Depends(get_db)):
+    vendas = (
+        db.query(models.VendaDiaria)
+        .filter(models.VendaDiaria.dia == dia)
+        .order_by(models.VendaDiaria.status)
+        .all()
+    )
+    return [
+        VendaDiariaOut(dia=v.dia, status=v.status, pedidos=v.pedidos, receita=float(v.receita))
+        for v in vendas
+    ]
+
+
+@app.get("/admin/profiling", response_model=ProfilingConfigOut)
+def obter_profiling(profiler: Profiler = Depends(get_profiler)):
+    return ProfilingConfigOut(sample_rate=profiler.sample_rate, output_dir=profiler.output_dir)
+
+
+@app.put("/admin/profiling", response_model=ProfilingConfigOut)
+def atualizar_profiling(
+    payload: ProfilingConfigIn,
+    profiler: Profiler = Depends(get_profiler),
+    cache: Optional[Redis] = Depends(get_redis_client),
+    admin_token: Optional[str] = Header(None, alias="X-Admin-Token"),
+):
+    if PROFILE_ADMIN_TOKEN and not hmac.compare_digest(admin_token or "", PROFILE_ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Token de administração inválido")
+    profiler.set_sample_rate(payload.sample_rate)
+    publicar_sample_rate(cache, payload.sample_rate)
+    return ProfilingConfigOut(sample_rate=profiler.sample_rate, output_dir=profiler.output_dir)
+
+
 # Root for quick health check
 @app.get("/")
 def root():
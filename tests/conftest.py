@@ -29,9 +29,19 @@ class FakeCache:
     def get(self, key):
         return self.store.get(key)
 
+    def set(self, key, value):
+        self.store[key] = value
+
     def setex(self, key, ttl, value):
         self.store[key] = value
 
+    def scan_iter(self, match=None, count=None):
+        prefix = (match or "*").rstrip("*")
+        return [key for key in list(self.store) if key.startswith(prefix)]
+
+    def delete(self, *keys):
+        return sum(1 for key in keys if self.store.pop(key, None) is not None)
+
 
 def _make_test_session():
     # Use a single in-memory SQLite DB shared across connections
@@ -1,4 +1,23 @@
-from tests.conftest import cleanup_overrides, create_client_with_db, seed_products
+import csv
+import io
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app import models
+from app.catalogo import importar_produtos
+from app.profiling import PROFILE_HEADER, PROFILE_RATE_KEY, Profiler, get_profiler
+from app.messaging import get_queue_publisher
+from app.database import get_db
+from tests.conftest import _make_test_session, cleanup_overrides, create_client_with_db, seed_products
+from main import app
 from worker import process_order_message
 
 
@@ -69,3 +88,253 @@ def test_criar_e_buscar_pedido():
         assert abs(pedido2["total"] - 36.00) < 1e-6
     finally:
         cleanup_overrides()
+
+
+def test_agregados_de_vendas_atualizados_pelo_worker():
+    client, SessionLocal, _, publisher, _ = create_client_with_db()
+    try:
+        with SessionLocal() as s:
+            prods = seed_products(s)
+            a_id, b_id = prods[0].id, prods[1].id
+
+        payload = {
+            "itens": [
+                {"produto_id": a_id, "quantidade": 2},
+                {"produto_id": b_id, "quantidade": 3},
+            ]
+        }
+        for _ in range(2):
+            r = client.post("/pedidos", json=payload)
+            assert r.status_code == 201, r.text
+            assert process_order_message(publisher.messages[-1], session_factory=SessionLocal)
+
+        r = client.get(f"/vendas/produtos/{a_id}")
+        assert r.status_code == 200
+        assert r.json()["unidades"] == 4
+        assert abs(r.json()["receita"] - 42.00) < 1e-6
+
+        top = client.get("/vendas/produtos/top", params={"limit": 1}).json()
+        assert [v["produto_id"] for v in top] == [b_id]
+
+        with SessionLocal() as s:
+            dia = s.query(models.Pedido).first().created_at.date()
+        dias = client.get(f"/vendas/dias/{dia.isoformat()}").json()
+        assert len(dias) == 1
+        assert dias[0]["status"] == "CRIADO"
+        assert dias[0]["pedidos"] == 2
+        assert abs(dias[0]["receita"] - 72.00) < 1e-6
+    finally:
+        cleanup_overrides()
+
+
+def test_profiling_por_header_e_taxa_em_runtime(tmp_path):
+    client, SessionLocal, _, publisher, cache = create_client_with_db()
+    profiler = Profiler(output_dir=str(tmp_path), sample_rate=0.0)
+    app.dependency_overrides[get_profiler] = lambda: profiler
+    try:
+        with SessionLocal() as s:
+            a_id = seed_products(s)[0].id
+        payload = {"itens": [{"produto_id": a_id, "quantidade": 1}]}
+
+        r = client.post("/pedidos", json=payload)
+        assert r.status_code == 201
+        for valor in ("0", "false"):
+            r = client.post("/pedidos", json=payload, headers={PROFILE_HEADER: valor})
+            assert r.status_code == 201
+        assert list(tmp_path.iterdir()) == []
+
+        r = client.post("/pedidos", json=payload, headers={PROFILE_HEADER: "1"})
+        assert r.status_code == 201
+        pedido_id = r.json()["id"]
+        assert [p.name.split("-")[:2] for p in tmp_path.iterdir()] == [["criar_pedido", str(pedido_id)]]
+
+        r = client.put("/admin/profiling", json={"sample_rate": 1.0})
+        assert r.status_code == 200
+        assert client.get("/admin/profiling").json()["sample_rate"] == 1.0
+        assert client.put("/admin/profiling", json={"sample_rate": 2}).status_code == 422
+
+        # outro processo (ex.: worker) adota a taxa publicada no Redis
+        outro = Profiler(output_dir=str(tmp_path), sample_rate=0.0)
+        outro.sincronizar(cache)
+        assert outro.sample_rate == 1.0
+        # chave expirada: volta a taxa inicial
+        del cache.store[PROFILE_RATE_KEY]
+        outro.sincronizar(cache)
+        assert outro.sample_rate == 0.0
+
+        client.post("/pedidos", json=payload)
+        assert len(list(tmp_path.iterdir())) == 2
+    finally:
+        cleanup_overrides()
+
+
+def test_exportar_pedidos_ndjson_csv_e_retomada():
+    client, SessionLocal, _, publisher, _ = create_client_with_db()
+    try:
+        with SessionLocal() as s:
+            a_id, b_id = [p.id for p in seed_products(s)]
+
+        ids = []
+        for quantidade in (1, 2, 3):
+            r = client.post(
+                "/pedidos",
+                json={"itens": [{"produto_id": a_id, "quantidade": quantidade}, {"produto_id": b_id, "quantidade": 1}]},
+            )
+            ids.append(r.json()["id"])
+        process_order_message(publisher.messages[0], session_factory=SessionLocal)
+        process_order_message(publisher.messages[2], session_factory=SessionLocal)
+
+        r = client.get("/pedidos/export", params={"status": "CRIADO"})
+        assert r.status_code == 200
+        assert r.headers["content-type"].startswith("application/x-ndjson")
+        pedidos = [json.loads(linha) for linha in r.text.splitlines()]
+        assert [p["id"] for p in pedidos] == [ids[0], ids[2]]
+        assert [it["quantidade"] for it in pedidos[1]["itens"]] == [3, 1]
+
+        r = client.get("/pedidos/export", params={"formato": "csv", "after_id": ids[0]})
+        assert r.status_code == 200
+        linhas = list(csv.DictReader(io.StringIO(r.text)))
+        # pedido PENDENTE ainda sem itens + pedido CRIADO com 2 itens
+        assert [int(l["pedido_id"]) for l in linhas] == [ids[1], ids[2], ids[2]]
+        assert linhas[0]["produto_id"] == ""
+
+        assert client.get("/pedidos/export", params={"formato": "xml"}).status_code == 400
+        assert client.get("/pedidos/export", params={"status": "FOO"}).status_code == 400
+    finally:
+        cleanup_overrides()
+
+
+def test_importar_catalogo_csv_e_ndjson():
+    client, SessionLocal, _, _, cache = create_client_with_db()
+    try:
+        client.get("/produtos")
+        assert "produtos:0:100" in cache.store
+
+        csv_body = "sku,nome,preco,estoque\nSKU-1,Martelo,29.90,10\nSKU-2,Trena 5m,19.50,7\nSKU-1,Martelo Unha,31.00,12\n"
+        r = client.post("/produtos/import", params={"formato": "csv"}, content=csv_body.encode("utf-8"))
+        assert r.status_code == 200, r.text
+        assert r.json()["linhas"] == 3
+        assert r.json()["linhas_por_segundo"] > 0
+        assert "produtos:0:100" not in cache.store
+
+        ndjson_body = '{"sku": "SKU-2", "nome": "Trena 5m", "preco": "21.00", "estoque": 3}\n{"sku": "SKU-3", "nome": "Nivel", "preco": 45}\n'
+        r = client.post("/produtos/import", params={"formato": "ndjson"}, content=ndjson_body.encode("utf-8"))
+        assert r.status_code == 200, r.text
+
+        produtos = {p["sku"]: p for p in client.get("/produtos").json()}
+        assert set(produtos) == {"SKU-1", "SKU-2", "SKU-3"}
+        assert produtos["SKU-3"]["nome"] == "Nivel"
+        assert produtos["SKU-1"]["nome"] == "Martelo Unha"
+        assert produtos["SKU-2"]["preco"] == 21.00
+        assert produtos["SKU-3"]["estoque"] == 0
+
+        bom_body = "\ufeffsku,nome,preco,estoque\nSKU-4,Alicate,15.00,2\n"
+        r = client.post("/produtos/import", params={"formato": "csv"}, content=bom_body.encode("utf-8"))
+        assert r.status_code == 200, r.text
+
+        r = client.post("/produtos/import", params={"formato": "csv"}, content=b"sku,nome,preco\nSKU-9,X,abc\n")
+        assert r.status_code == 400
+        with SessionLocal() as s:
+            assert s.query(models.Produto).filter(models.Produto.sku == "SKU-9").count() == 0
+    finally:
+        cleanup_overrides()
+
+
+def test_top_produtos_limita_limit():
+    client, _, _, _, _ = create_client_with_db()
+    try:
+        assert client.get("/vendas/produtos/top", params={"limit": -1}).status_code == 422
+        assert client.get("/vendas/produtos/top", params={"limit": 101}).status_code == 422
+        assert client.get("/vendas/produtos/top", params={"limit": 100}).status_code == 200
+    finally:
+        cleanup_overrides()
+
+
+def test_profiling_concorrente_nao_falha(tmp_path):
+    client, _, _, _, _ = create_client_with_db()
+    profiler = Profiler(output_dir=str(tmp_path), sample_rate=0.0)
+    barreira = threading.Barrier(2, timeout=5)
+
+    def get_db_isolado():
+        # cada requisicao usa seu proprio banco em memoria para poderem rodar em paralelo
+        _, SessionLocal = _make_test_session()
+        db = SessionLocal()
+        seed_products(db)
+        try:
+            yield db
+        finally:
+            db.close()
+
+    class PublisherSincronizado:
+        def publish_pedido(self, pedido_id, itens):
+            # garante que as duas requisicoes estejam dentro do perfil ao mesmo tempo
+            barreira.wait()
+
+    app.dependency_overrides[get_db] = get_db_isolado
+    app.dependency_overrides[get_profiler] = lambda: profiler
+    app.dependency_overrides[get_queue_publisher] = lambda: PublisherSincronizado()
+    try:
+        payload = {"itens": [{"produto_id": 1, "quantidade": 1}]}
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            respostas = list(
+                pool.map(
+                    lambda _: client.post("/pedidos", json=payload, headers={PROFILE_HEADER: "true"}),
+                    range(2),
+                )
+            )
+        assert [r.status_code for r in respostas] == [201, 201]
+        assert len(list(tmp_path.iterdir())) == 1
+    finally:
+        cleanup_overrides()
+
+
+def test_profiling_respeita_limite_de_arquivos(tmp_path):
+    profiler = Profiler(output_dir=str(tmp_path), sample_rate=0.0, max_files=2)
+    for _ in range(4):
+        with profiler.profile("limite", forced=True):
+            pass
+    assert len(list(tmp_path.iterdir())) == 2
+
+
+def test_admin_profiling_exige_token_quando_configurado(monkeypatch, tmp_path):
+    client, _, _, _, _ = create_client_with_db()
+    profiler = Profiler(output_dir=str(tmp_path), sample_rate=0.0)
+    app.dependency_overrides[get_profiler] = lambda: profiler
+    monkeypatch.setattr("main.PROFILE_ADMIN_TOKEN", "segredo")
+    try:
+        assert client.put("/admin/profiling", json={"sample_rate": 0.5}).status_code == 403
+        r = client.put("/admin/profiling", json={"sample_rate": 0.5}, headers={"X-Admin-Token": "segredo"})
+        assert r.status_code == 200
+        assert profiler.sample_rate == 0.5
+    finally:
+        cleanup_overrides()
+
+
+def test_criar_schema_atualiza_tabela_produtos_antiga():
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    with engine.begin() as conn:
+        # tabela como criada pela versao sem sku
+        conn.execute(text(
+            "CREATE TABLE produtos (id INTEGER PRIMARY KEY, nome VARCHAR(255) NOT NULL, "
+            "preco NUMERIC(10, 2) NOT NULL, estoque INTEGER NOT NULL, created_at DATETIME NOT NULL)"
+        ))
+        conn.execute(text(
+            "INSERT INTO produtos (nome, preco, estoque, created_at) VALUES ('Antigo', 1.00, 1, '2024-01-01')"
+        ))
+
+    models.criar_schema(engine)
+    models.criar_schema(engine)  # idempotente
+
+    SessionLocal = sessionmaker(bind=engine)
+    with SessionLocal() as db:
+        assert db.query(models.Produto).count() == 1
+        registros = [{"sku": "SKU-1", "nome": "Novo", "preco": Decimal("2.00"), "estoque": 1}] * 2
+        importar_produtos(db, registros)
+        assert db.query(models.Produto).filter(models.Produto.sku == "SKU-1").count() == 1
+        db.add(models.Produto(sku="SKU-1", nome="Duplicado", preco=Decimal("1.00"), estoque=0))
+        with pytest.raises(IntegrityError):
+            db.commit()
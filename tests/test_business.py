@@ -1,6 +1,9 @@
+import io
+import json
 from decimal import Decimal
 import pytest
 
+from app.catalogo import iter_registros
 from app.services import compute_total
 
 
@@ -26,3 +29,27 @@ def test_compute_total_negative_quantity_raises():
     with pytest.raises(ValueError):
         compute_total([(Decimal("10.00"), -1)])
 
+
+@pytest.mark.parametrize(
+    "raw",
+    [
+        {"sku": None, "nome": None, "preco": 1},
+        {"sku": "S1", "nome": "X", "preco": "NaN"},
+        {"sku": "S1", "nome": "X", "preco": "Infinity"},
+        {"sku": "S1", "nome": "X", "preco": "100000000"},
+        {"sku": "S1", "nome": "X", "preco": 1, "estoque": 3.9},
+        {"sku": "S1", "nome": "X", "preco": 1, "estoque": "3.9"},
+        {"sku": "S" * 65, "nome": "X", "preco": 1},
+    ],
+)
+def test_importacao_rejeita_registros_invalidos(raw):
+    arquivo = io.BytesIO((json.dumps(raw) + "\n").encode("utf-8"))
+    with pytest.raises(ValueError, match="Linha 1"):
+        list(iter_registros(arquivo, "ndjson"))
+
+
+def test_importacao_normaliza_registro_valido():
+    arquivo = io.BytesIO(b'{"sku": 123, "nome": " Nivel ", "preco": 45.5, "estoque": 3.0}\n')
+    assert list(iter_registros(arquivo, "ndjson")) == [
+        {"sku": "123", "nome": "Nivel", "preco": Decimal("45.50"), "estoque": 3}
+    ]
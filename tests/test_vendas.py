@@ -0,0 +1,59 @@
+from decimal import Decimal
+
+from app import models
+from app.vendas import rebuild_agregados, registrar_transicao
+from tests.conftest import _make_test_session, seed_products
+
+
+def test_cancelamento_estorna_agregados_e_rebuild_confere():
+    _, SessionLocal = _make_test_session()
+    with SessionLocal() as db:
+        a, b = seed_products(db)
+        pedido = models.Pedido(status="CRIADO", total=Decimal("36.00"))
+        pedido.itens = [
+            models.ItemPedido(produto_id=a.id, quantidade=2, preco_unitario=Decimal("10.50")),
+            models.ItemPedido(produto_id=b.id, quantidade=3, preco_unitario=Decimal("5.00")),
+        ]
+        db.add(pedido)
+        db.flush()
+        registrar_transicao(db, pedido, "PENDENTE", "CRIADO")
+        db.commit()
+        assert db.get(models.VendaProduto, a.id).unidades == 2
+
+        registrar_transicao(db, pedido, "CRIADO", "CANCELADO")
+        pedido.status = "CANCELADO"
+        db.commit()
+
+        def snapshot():
+            produtos = {v.produto_id: (v.unidades, Decimal(v.receita)) for v in db.query(models.VendaProduto)}
+            dias = {(v.status, v.pedidos, Decimal(v.receita)) for v in db.query(models.VendaDiaria)}
+            return produtos, dias
+
+        incremental = snapshot()
+        assert incremental[0][a.id] == (0, Decimal("0.00"))
+        assert ("CRIADO", 0, Decimal("0.00")) in incremental[1]
+        assert ("CANCELADO", 1, Decimal("36.00")) in incremental[1]
+
+        assert rebuild_agregados(db, batch_size=1) == (1, 0)
+        produtos, dias = snapshot()
+        assert produtos == {}
+        assert dias == {("CANCELADO", 1, Decimal("36.00"))}
+
+
+def test_itens_repetidos_somados_por_produto():
+    _, SessionLocal = _make_test_session()
+    with SessionLocal() as db:
+        a, b = seed_products(db)
+        pedido = models.Pedido(status="CRIADO", total=Decimal("41.00"))
+        pedido.itens = [
+            models.ItemPedido(produto_id=b.id, quantidade=1, preco_unitario=Decimal("5.00")),
+            models.ItemPedido(produto_id=a.id, quantidade=2, preco_unitario=Decimal("10.50")),
+            models.ItemPedido(produto_id=b.id, quantidade=3, preco_unitario=Decimal("5.00")),
+        ]
+        db.add(pedido)
+        db.flush()
+        registrar_transicao(db, pedido, "PENDENTE", "CRIADO")
+        db.commit()
+
+        vendas = {v.produto_id: (v.unidades, Decimal(v.receita)) for v in db.query(models.VendaProduto)}
+        assert vendas == {a.id: (2, Decimal("21.00")), b.id: (4, Decimal("20.00"))}
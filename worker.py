@@ -8,7 +8,9 @@ from sqlalchemy.orm import Session
 
 from app import models
 from app.database import SessionLocal
+from app.profiling import ProfileRun, debug_solicitado, get_profiler
 from app.services import build_item_specs
+from app.vendas import registrar_transicao
 
 logger = logging.getLogger(__name__)
 
@@ -20,6 +22,16 @@ SessionFactory = Callable[[], Session]
 
 def process_order_message(message: dict, session_factory: Optional[SessionFactory] = None) -> bool:
     """Processa uma mensagem individual vinda da fila."""
+    forced = debug_solicitado(message.get("debug_profile")) if isinstance(message, dict) else False
+    with get_profiler().profile("process_order_message", forced=forced) as perfil:
+        return _process_order_message(message, session_factory, perfil)
+
+
+def _process_order_message(
+    message: dict,
+    session_factory: Optional[SessionFactory],
+    perfil: ProfileRun,
+) -> bool:
     session_factory = session_factory or SessionLocal
     try:
         pedido_id = int(message["pedido_id"])
@@ -27,6 +39,8 @@ def process_order_message(message: dict, session_factory: Optional[SessionFactor
         logger.error("Mensagem inválida recebida: %s", message)
         return False
 
+    perfil.pedido_id = pedido_id
+
     itens_payload = message.get("itens") or []
     db = session_factory()
     try:
@@ -57,6 +71,7 @@ def process_order_message(message: dict, session_factory: Optional[SessionFactor
         ]
         pedido.total = total
         pedido.status = "CRIADO"
+        registrar_transicao(db, pedido, "PENDENTE", "CRIADO")
         db.commit()
         logger.info("Pedido %s processado com sucesso", pedido_id)
         return True
@@ -70,6 +85,7 @@ def process_order_message(message: dict, session_factory: Optional[SessionFactor
                 .first()
             )
             if pedido:
+                registrar_transicao(db, pedido, pedido.status, "CANCELADO")
                 pedido.itens = []
                 pedido.status = "CANCELADO"
                 db.commit()